@@ -109,22 +109,29 @@ class DriveMirrorApp(ctk.CTk):
         threading.Thread(target=self.run_async_mirror, args=(creds, output), daemon=True).start()
 
     def run_async_mirror(self, creds, output):
+        # Runs on the worker thread: every widget change is marshalled to Tk's thread via after()
         try:
             asyncio.run(self._async_mirror_task(creds, output))
             self.update_progress(1, 1, "")
-            self.progress_label.configure(text="Completed successfully!")
+            self.after(0, lambda: self.progress_label.configure(text="Completed successfully!"))
         except Exception as e:
             self.add_list_item(f"ERROR: {e}")
-            self.progress_label.configure(text=f"Error occurred: {e}")
+            error_text = f"Error occurred: {e}"
+            self.after(0, lambda: self.progress_label.configure(text=error_text))
         finally:
-            self.start_button.configure(state="normal", text="Start Mirror")
+            self.after(0, lambda: self.start_button.configure(state="normal", text="Start Mirror"))
 
     async def _async_mirror_task(self, creds, output):
         async for update in mirror_drive_async(creds, output, progress_callback=self.update_progress):
             self.add_list_item(update)
 
     # -------------------- UI UPDATES -------------------- #
+    # Tk is not thread-safe: these may be called from the worker thread, so they only
+    # schedule the actual widget changes on the main loop with after(0, ...).
     def update_progress(self, done, total, current_file):
+        self.after(0, self._apply_progress, done, total, current_file)
+
+    def _apply_progress(self, done, total, current_file):
         try:
             if total == 0:
                 return
@@ -135,11 +142,13 @@ class DriveMirrorApp(ctk.CTk):
             if current_file:
                 label_text += f" — {current_file}"
             self.progress_label.configure(text=label_text)
-            self.update_idletasks()
         except Exception:
             pass
 
     def add_list_item(self, msg):
+        self.after(0, self._append_list_item, msg)
+
+    def _append_list_item(self, msg):
         self.list_box.configure(state="normal")
         self.list_box.insert("end", msg + "\n")
         self.list_box.see("end")
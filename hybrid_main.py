@@ -4,11 +4,16 @@ import os
 import io
 import json
 import math
+import random
 import asyncio
 import aiohttp
+import queue
+import threading
+import functools
 import multiprocessing
-from multiprocessing import Pool, Manager
-from typing import List, Dict, Optional, Callable, Generator
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Set, Optional, Callable, Generator, AsyncGenerator
 from concurrent.futures import ThreadPoolExecutor
 
 # Google auth / Drive API imports (for initial auth & metadata fetching)
@@ -18,24 +23,75 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials as OAuth2Credentials
 
+# Use uvloop's libuv-based event loop when it is installed (not available on Windows)
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
 # ---------------- CONFIG ----------------
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
-CHUNK_SIZE = 1024 * 64  # 64 KB per read from aiohttp stream
+CHUNK_SIZE = 1024 * 1024  # 1 MiB write granularity for downloaded data
+CONNECTION_LIMIT = 128         # total pooled connections in the shared session
+CONNECTION_LIMIT_PER_HOST = 32 # keep-alive connections per Google host
+DNS_CACHE_TTL = 300            # seconds
+KEEPALIVE_TIMEOUT = 75         # seconds an idle connection is kept for reuse
+DRIVE_FILES_URL = 'https://www.googleapis.com/drive/v3/files'
+LIST_PARTITIONS = 4            # concurrent modifiedTime ranges walked while listing
+BUFFER_POOL_SIZE = CONNECTION_LIMIT_PER_HOST  # one write buffer per concurrent download
+MAX_ATTEMPTS = 6               # tries per file before giving up
+MAX_BACKOFF = 60               # seconds, upper bound for a single retry delay
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REQUESTS_PER_SECOND = 8        # stay under Drive's per-user request quota
+CONCURRENCY_RECOVERY = 60      # seconds between +1 steps after a 429 halved concurrency
+WRITER_THREADS = 4             # threads dedicated to disk writes
+TASK_QUEUE_SIZE = 4096         # listed files buffered ahead of the download workers
+# Largest files first (LPT scheduling): a big file listed last would otherwise keep the run
+# open long after everything else finished. Listing is streamed, so Drive does the sorting.
+LIST_ORDER = 'quotaBytesUsed desc'
+MTIME_TOLERANCE = 2            # seconds of slack when comparing local and Drive modification times
+EXPORT_MIME = {
+    'application/vnd.google-apps.document': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.google-apps.spreadsheet': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'application/vnd.google-apps.presentation': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+}
+EXPORT_EXT = {
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '.docx',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': '.xlsx',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation': '.pptx',
+    'application/pdf': '.pdf'
+}
+_SANITIZE_TABLE = {ord(c): None for c in '\\/:*?"<>|'}  # characters stripped from file names
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+_APPEND_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0)
 # ----------------------------------------
 
-def authenticate_and_export_credentials(credentials_json_path: str, token_pickle_path: Optional[str] = None):
+def authenticate_and_export_credentials(credentials_json_path: str,
+                                        token_pickle_path: Optional[str] = None,
+                                        token_path: Optional[str] = None):
     """
     Authenticate once using InstalledAppFlow and return a serializable credentials payload
     that worker processes can use to refresh tokens without user interaction.
     Also returns an authenticated Drive service (for listing files).
+    The token is stored as JSON in `token_path` (default: token.json next to the credentials);
+    a legacy `token_pickle_path` (default: token.pickle) is converted once if no JSON token exists.
     """
+    token_dir = os.path.dirname(credentials_json_path)
+    if token_path is None:
+        token_path = os.path.join(token_dir, 'token.json')
     if token_pickle_path is None:
-        token_pickle_path = os.path.join(os.path.dirname(credentials_json_path), 'token.pickle')
+        token_pickle_path = os.path.join(token_dir, 'token.pickle')
 
     creds = None
-    if os.path.exists(token_pickle_path):
+    if os.path.exists(token_path):
+        with open(token_path, 'r') as f:
+            creds = OAuth2Credentials.from_authorized_user_info(json.load(f), SCOPES)
+    elif os.path.exists(token_pickle_path):
         with open(token_pickle_path, 'rb') as f:
             creds = pickle.load(f)
+        with open(token_path, 'w') as f:
+            f.write(creds.to_json())
 
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
@@ -43,8 +99,8 @@ def authenticate_and_export_credentials(credentials_json_path: str, token_pickle
         else:
             flow = InstalledAppFlow.from_client_secrets_file(credentials_json_path, SCOPES)
             creds = flow.run_local_server(port=0)
-        with open(token_pickle_path, 'wb') as f:
-            pickle.dump(creds, f)
+        with open(token_path, 'w') as f:
+            f.write(creds.to_json())
 
     # Build Drive service for metadata listing
     service = build('drive', 'v3', credentials=creds)
@@ -60,37 +116,169 @@ def authenticate_and_export_credentials(credentials_json_path: str, token_pickle
     }
     return service, payload
 
-def list_all_drive_files(service) -> List[Dict]:
-    """List files and return minimal metadata list for download tasks."""
-    files = []
+def list_all_drive_files(service) -> Generator[Dict, None, None]:
+    """Yield minimal file metadata for download tasks, page by page as responses arrive."""
     page_token = None
     while True:
         response = service.files().list(
             q="'me' in owners",
-            fields="nextPageToken, files(id, name, mimeType, parents, size)",
+            orderBy=LIST_ORDER,
+            fields="nextPageToken, files(id, name, mimeType, size, modifiedTime)",
             pageToken=page_token,
             pageSize=1000
         ).execute()
-        files.extend(response.get('files', []))
+        yield from response.get('files', [])
         page_token = response.get('nextPageToken', None)
         if not page_token:
             break
-    return files
-
-def _chunkify(lst: List, n: int) -> List[List]:
-    """Split list into n approximately-equal chunks."""
-    if n <= 0:
-        return [lst]
-    k, m = divmod(len(lst), n)
-    chunks = []
-    start = 0
-    for i in range(n):
-        size = k + (1 if i < m else 0)
-        chunks.append(lst[start:start+size])
-        start += size
-    return chunks
-
-# ---------------- Worker process functions ----------------
+
+def _parse_drive_time(value: Optional[str]) -> Optional[datetime]:
+    """Parse an RFC 3339 timestamp as returned by Drive (e.g. '2024-01-31T12:00:00.000Z')."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+async def _list_request(session: aiohttp.ClientSession, creds: OAuth2Credentials, params: dict,
+                        throttle: Optional[_Throttle] = None) -> dict:
+    """
+    Issue one files.list call over the shared aiohttp session, paced by `throttle` when given.
+    Transient failures (429/5xx, dropped connections, timeouts) are retried with backoff like
+    downloads are, and a 429 also shrinks the throttle's concurrency.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        last_attempt = attempt == MAX_ATTEMPTS - 1
+        if throttle:
+            await throttle.pace()
+        headers = {'Authorization': f'Bearer {creds.token}'}
+        try:
+            async with session.get(DRIVE_FILES_URL, params=params, headers=headers) as resp:
+                if resp.status not in RETRY_STATUSES or last_attempt:
+                    resp.raise_for_status()
+                    return await resp.json()
+                if resp.status == 429 and throttle:
+                    throttle.throttled()
+                delay = _retry_delay(attempt, resp.headers)
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+            if last_attempt:
+                raise
+            delay = _retry_delay(attempt)
+        await asyncio.sleep(delay)
+
+async def _modified_time_bounds(session: aiohttp.ClientSession, creds: OAuth2Credentials,
+                                throttle: Optional[_Throttle] = None):
+    """Return (oldest, newest) modifiedTime of the listed files, or None when there are no files."""
+    bounds = []
+    for order in ('modifiedTime', 'modifiedTime desc'):
+        data = await _list_request(session, creds, {
+            'q': "'me' in owners",
+            'orderBy': order,
+            'fields': 'files(modifiedTime)',
+            'pageSize': 1
+        }, throttle)
+        files = data.get('files', [])
+        if not files:
+            return None
+        bounds.append(_parse_drive_time(files[0]['modifiedTime']))
+    return bounds[0], bounds[1]
+
+def _partition_queries(oldest: datetime, newest: datetime, partitions: int) -> List[str]:
+    """
+    Split the listing query into disjoint modifiedTime ranges. The first and last ranges are
+    open-ended so files newer than the bounds snapshot are still covered. A file modified while
+    listing can match both its old range and the last one (the caller drops the duplicate), and
+    is missed once the last range has already been paged past; the next run picks it up.
+    """
+    step = (newest - oldest) / max(1, partitions)
+    cuts = []
+    for i in range(1, partitions):
+        cut = (oldest + step * i).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+        if not cuts or cut != cuts[-1]:
+            cuts.append(cut)
+    if not cuts:
+        return ["'me' in owners"]
+    queries = [f"'me' in owners and modifiedTime < '{cuts[0]}'"]
+    for lo, hi in zip(cuts, cuts[1:]):
+        queries.append(f"'me' in owners and modifiedTime >= '{lo}' and modifiedTime < '{hi}'")
+    queries.append(f"'me' in owners and modifiedTime >= '{cuts[-1]}'")
+    return queries
+
+async def _list_partition(session: aiohttp.ClientSession, creds: OAuth2Credentials, query: str,
+                          pages: asyncio.Queue, throttle: Optional[_Throttle] = None):
+    """Walk every page of a single partition query, putting each page's files into `pages`."""
+    page_token = None
+    try:
+        while True:
+            params = {
+                'q': query,
+                'orderBy': LIST_ORDER,
+                'fields': 'nextPageToken, files(id, name, mimeType, size, modifiedTime)',
+                'pageSize': 1000
+            }
+            if page_token:
+                params['pageToken'] = page_token
+            response = await _list_request(session, creds, params, throttle)
+            await pages.put(response.get('files', []))
+            page_token = response.get('nextPageToken', None)
+            if not page_token:
+                break
+    finally:
+        # end-of-partition marker, also sent on failure so the consumer never waits forever
+        await pages.put(None)
+
+async def list_all_drive_files_async(session: aiohttp.ClientSession,
+                                     creds: OAuth2Credentials,
+                                     partitions: int = LIST_PARTITIONS,
+                                     throttle: Optional[_Throttle] = None) -> AsyncGenerator[Dict, None]:
+    """
+    Async counterpart of list_all_drive_files(). Pagination within one query is sequential,
+    so the query is split into `partitions` modifiedTime ranges that are paged concurrently.
+    Files are yielded as their page arrives; at most one page per partition is buffered.
+    Each file id is yielded once, even if a concurrent modification moved it between ranges.
+    With a `throttle`, every files.list call counts against its request rate.
+    """
+    bounds = await _modified_time_bounds(session, creds, throttle)
+    if bounds is None:
+        return
+    queries = _partition_queries(bounds[0], bounds[1], partitions)
+    pages: asyncio.Queue = asyncio.Queue(maxsize=len(queries))
+    walkers = [asyncio.create_task(_list_partition(session, creds, q, pages, throttle)) for q in queries]
+    seen: Set[str] = set()
+    try:
+        remaining = len(walkers)
+        while remaining:
+            page = await pages.get()
+            if page is None:
+                remaining -= 1
+                continue
+            for f in page:
+                if f['id'] in seen:
+                    continue
+                seen.add(f['id'])
+                yield f
+        for walker in walkers:
+            walker.result()  # re-raise a failed partition
+    finally:
+        for walker in walkers:
+            walker.cancel()
+
+# ---------------- Download helpers ----------------
+
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+async def get_session() -> aiohttp.ClientSession:
+    """
+    Return the shared aiohttp session, creating it lazily on first use (or after it was closed).
+    Every download reuses its connection pool so TLS handshakes and DNS lookups are paid once per host.
+    """
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        connector = aiohttp.TCPConnector(limit=CONNECTION_LIMIT,
+                                         limit_per_host=CONNECTION_LIMIT_PER_HOST,
+                                         ttl_dns_cache=DNS_CACHE_TTL,
+                                         keepalive_timeout=KEEPALIVE_TIMEOUT)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60*10)  # generous read timeout
+        _SESSION = aiohttp.ClientSession(connector=connector, timeout=timeout)
+    return _SESSION
 
 def _recreate_creds_from_payload(payload: dict) -> OAuth2Credentials:
     """
@@ -107,133 +295,436 @@ def _recreate_creds_from_payload(payload: dict) -> OAuth2Credentials:
     )
     return creds
 
-async def _download_file_aio(session: aiohttp.ClientSession, url: str, headers: dict, dest_path: str):
+_BUFFER_POOL: Optional[asyncio.Queue] = None
+_BUFFER_POOL_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+def _get_buffer_pool() -> asyncio.Queue:
+    """
+    Return the pool of preallocated CHUNK_SIZE write buffers for the running event loop.
+    Downloads borrow a buffer for their lifetime, so peak buffer memory is
+    BUFFER_POOL_SIZE * CHUNK_SIZE no matter how many files are mirrored.
+    """
+    global _BUFFER_POOL, _BUFFER_POOL_LOOP
+    loop = asyncio.get_running_loop()
+    if _BUFFER_POOL is None or _BUFFER_POOL_LOOP is not loop:
+        pool = asyncio.Queue()
+        for _ in range(BUFFER_POOL_SIZE):
+            pool.put_nowait(bytearray(CHUNK_SIZE))
+        _BUFFER_POOL, _BUFFER_POOL_LOOP = pool, loop
+    return _BUFFER_POOL
+
+# Disk writes run here so a slow destination never stalls the event loop's socket reads
+_WRITER_POOL = ThreadPoolExecutor(max_workers=WRITER_THREADS, thread_name_prefix='drive-writer')
+
+async def ensure_dir(path: str, created: Optional[Set[str]] = None) -> None:
+    """
+    Create `path` (and parents) unless it is already in `created`, the set of directories made
+    during the current run. Most files share a handful of directories, so this skips the
+    makedirs syscalls for every file after the first. The set must not outlive a run: the
+    output folder may have been deleted or moved before the next one.
+    """
+    path = path or '.'
+    if created is not None and path in created:
+        return
+    # filesystem metadata calls can stall on network mounts; keep them off the event loop
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, functools.partial(os.makedirs, path, exist_ok=True))
+    if created is not None:
+        created.add(path)
+
+def _write_all(fd: int, data) -> None:
+    """os.write() until every byte of `data` has been handed to the kernel."""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+async def _write_in_pool(fd: int, data) -> None:
+    """
+    _write_all() on _WRITER_POOL. The thread cannot be interrupted, so when the caller is
+    cancelled this still waits for the write to finish before re-raising: the caller's cleanup
+    must not close `fd` (whose number may then be reused) or recycle `data` while it is in use.
+    """
+    fut = asyncio.get_running_loop().run_in_executor(_WRITER_POOL, _write_all, fd, data)
+    try:
+        await asyncio.shield(fut)
+    except asyncio.CancelledError:
+        while not fut.done():
+            try:
+                await asyncio.wait({fut})
+            except asyncio.CancelledError:
+                pass
+        raise
+
+def _retry_delay(attempt: int, headers=None) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based): the server's Retry-After
+    when it sent one, otherwise jittered exponential backoff.
+    """
+    retry_after = headers.get('Retry-After') if headers else None
+    if retry_after:
+        try:
+            return min(MAX_BACKOFF, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(retry_after)
+                return min(MAX_BACKOFF, max(0.0, (when - datetime.now(timezone.utc)).total_seconds()))
+            except (TypeError, ValueError):
+                pass
+    return min(MAX_BACKOFF, 2 ** attempt + random.uniform(0, 1))
+
+class _Throttle:
+    """
+    Request pacing for the Drive API: a token bucket allowing REQUESTS_PER_SECOND requests,
+    plus an AIMD concurrency limit that halves on every 429 and grows back by one slot
+    every CONCURRENCY_RECOVERY seconds up to the initial limit.
+    Used as `async with throttle:` around a whole download.
+    """
+
+    def __init__(self, max_concurrency: int, rate: float = REQUESTS_PER_SECOND):
+        self.max_concurrency = max_concurrency
+        self.target_concurrency = max_concurrency
+        self._active = 0
+        self._cond = asyncio.Condition()
+        self._rate = rate
+        self._tokens = float(rate)
+        self._loop = asyncio.get_running_loop()
+        self._last_refill = self._loop.time()
+        self._last_change = self._last_refill
+
+    async def __aenter__(self):
+        async with self._cond:
+            self._maybe_grow()
+            await self._cond.wait_for(lambda: self._active < self.target_concurrency)
+            self._active += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        async with self._cond:
+            self._active -= 1
+            self._maybe_grow()
+            self._cond.notify_all()
+
+    async def pace(self) -> None:
+        """Wait until the token bucket allows one more request."""
+        while True:
+            now = self._loop.time()
+            self._tokens = min(self._rate, self._tokens + (now - self._last_refill) * self._rate)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    def throttled(self) -> None:
+        """Record a 429: halve the concurrency target."""
+        self.target_concurrency = max(1, self.target_concurrency // 2)
+        self._last_change = self._loop.time()
+
+    def _maybe_grow(self) -> None:
+        now = self._loop.time()
+        if self.target_concurrency < self.max_concurrency and now - self._last_change >= CONCURRENCY_RECOVERY:
+            self.target_concurrency += 1
+            self._last_change = now
+
+async def _fetch_to_part(session: aiohttp.ClientSession, url: str, headers: dict, tmp_path: str):
+    """
+    Single attempt: stream `url` into `tmp_path`. When a partial `tmp_path` is left over from
+    an earlier attempt or run, only the missing bytes are requested with a Range header.
+    """
+    existing = os.path.getsize(tmp_path) if os.path.exists(tmp_path) else 0
+    request_headers = headers
+    if existing:
+        # identity encoding: a byte range of a gzip body cannot be decoded on its own
+        request_headers = dict(headers, Range=f'bytes={existing}-', **{'Accept-Encoding': 'identity'})
+    async with session.get(url, headers=request_headers) as resp:
+        if existing and resp.status == 416:
+            # "Content-Range: bytes */N": the .part already holds all N bytes (e.g. a crash
+            # just before os.replace), so there is nothing left to fetch
+            total = resp.headers.get('Content-Range', '').rpartition('/')[2]
+            if total.isdigit() and int(total) == existing:
+                return
+            # stale .part (e.g. the file changed remotely): start over
+            os.remove(tmp_path)
+            return await _fetch_to_part(session, url, headers, tmp_path)
+        resp.raise_for_status()
+        # 206 -> append to the partial file; 200 -> server ignored Range, rewrite from scratch
+        flags = _APPEND_FLAGS if existing and resp.status == 206 else _WRITE_FLAGS
+        # write in streaming fashion: coalesce socket reads into a pooled buffer
+        # and flush it once full, so writes happen in CHUNK_SIZE units
+        pool = _get_buffer_pool()
+        buf = await pool.get()
+        try:
+            fd = os.open(tmp_path, flags, 0o666)
+            try:
+                filled = 0
+                async for chunk in resp.content.iter_any():
+                    if not chunk:
+                        break
+                    size = len(chunk)
+                    if filled + size > CHUNK_SIZE:
+                        if filled:
+                            await _write_in_pool(fd, memoryview(buf)[:filled])
+                            filled = 0
+                        if size >= CHUNK_SIZE:
+                            await _write_in_pool(fd, chunk)
+                            continue
+                    buf[filled:filled + size] = chunk
+                    filled += size
+                if filled:
+                    await _write_in_pool(fd, memoryview(buf)[:filled])
+            finally:
+                os.close(fd)
+        finally:
+            pool.put_nowait(buf)
+
+def _claim_part(tmp_path: str, revision: Optional[str]) -> None:
+    """
+    Make `tmp_path` safe to resume for `revision` of the remote file. A .part left by another
+    revision (or whose revision is unknown) would be spliced with the new file's bytes, so it
+    is discarded; the revision it is now being written for is recorded in a '.rev' sidecar.
+    """
+    rev_path = tmp_path + '.rev'
+    try:
+        with open(rev_path, 'r') as fh:
+            saved = fh.read()
+    except OSError:
+        saved = None
+    if revision is not None and saved == revision:
+        return
+    for path in (tmp_path, rev_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    if revision is not None:
+        with open(rev_path, 'w') as fh:
+            fh.write(revision)
+
+async def _download_file_aio(session: aiohttp.ClientSession, url: str, headers: dict, dest_path: str,
+                             throttle: Optional[_Throttle] = None, mtime: Optional[float] = None,
+                             created_dirs: Optional[Set[str]] = None):
     """
     Stream-download a file from `url` using aiohttp session and write to `dest_path`.
+    Transient failures (429/5xx, dropped connections, timeouts) are retried with backoff.
+    With a `throttle`, every attempt waits for a request token and 429s shrink its concurrency.
+    `mtime` (seconds since the epoch) is stamped on the finished file so later runs can skip it;
+    it also identifies the revision a leftover .part belongs to, which is only resumed if it matches.
+    `created_dirs` is the run's set of already created directories (see ensure_dir()).
     """
     tmp_path = dest_path + '.part'
-    os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
-    async with session.get(url, headers=headers) as resp:
-        resp.raise_for_status()
-        # write in streaming fashion
-        with open(tmp_path, 'wb') as fd:
-            async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
-                if not chunk:
-                    break
-                fd.write(chunk)
-    # atomic replace
-    os.replace(tmp_path, dest_path)
+    await ensure_dir(os.path.dirname(dest_path), created_dirs)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, _claim_part, tmp_path, None if mtime is None else repr(mtime))
+    for attempt in range(MAX_ATTEMPTS):
+        last_attempt = attempt == MAX_ATTEMPTS - 1
+        try:
+            if throttle:
+                await throttle.pace()
+            await _fetch_to_part(session, url, headers, tmp_path)
+            break
+        except aiohttp.ClientResponseError as e:
+            if e.status == 429 and throttle:
+                throttle.throttled()
+            if e.status not in RETRY_STATUSES or last_attempt:
+                raise
+            delay = _retry_delay(attempt, e.headers)
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+            if last_attempt:
+                raise
+            delay = _retry_delay(attempt)
+        await asyncio.sleep(delay)
+    if mtime is not None:
+        await loop.run_in_executor(None, os.utime, tmp_path, (mtime, mtime))
+    # atomic replace, also off the event loop
+    await loop.run_in_executor(None, os.replace, tmp_path, dest_path)
+    await loop.run_in_executor(None, _claim_part, tmp_path, None)  # drop the now orphaned sidecar
     return dest_path
 
 def _map_export_mime(mime_type: str) -> Optional[str]:
     """
-    Map google-apps mime types to export mime types. Extend as needed.
+    Map google-apps mime types to export mime types. Extend EXPORT_MIME as needed.
     """
-    if mime_type == 'application/vnd.google-apps.document':
-        return 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-    if mime_type == 'application/vnd.google-apps.spreadsheet':
-        return 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    if mime_type == 'application/vnd.google-apps.presentation':
-        return 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
     # fallback to PDF for unknown google-apps types
-    if mime_type.startswith('application/vnd.google-apps'):
-        return 'application/pdf'
-    return None
+    return EXPORT_MIME.get(mime_type, 'application/pdf' if mime_type.startswith('application/vnd.google-apps') else None)
 
-def _worker_process_main(credentials_payload: dict,
-                         file_tasks: List[Dict],
+def _is_up_to_date(dest: str, task_meta: Dict) -> bool:
+    """
+    True when `dest` already holds this Drive file: same size (when Drive reports one) and not
+    older than its Drive modifiedTime. Exported google-apps files have no size, so for them the
+    modification time alone decides.
+    """
+    size = task_meta.get('size')
+    modified = _parse_drive_time(task_meta.get('modifiedTime'))
+    if size is None and modified is None:
+        return False
+    try:
+        st = os.stat(dest)
+    except OSError:
+        return False
+    if size is not None and st.st_size != int(size):
+        return False
+    return modified is None or st.st_mtime + MTIME_TOLERANCE >= modified.timestamp()
+
+async def _download_task(session: aiohttp.ClientSession,
+                         throttle: _Throttle,
+                         creds: OAuth2Credentials,
+                         task_meta: Dict,
                          output_folder: str,
-                         queue: "multiprocessing.managers.SyncManager().Queue",
-                         tasks_per_process: int = 24,
-                         process_id: int = 0):
+                         notices: asyncio.Queue,
+                         created_dirs: Optional[Set[str]] = None) -> str:
     """
-    Executed inside each spawned process. Reconstruct credentials, run an asyncio loop,
-    download assigned files concurrently with aiohttp, and push progress messages into `queue`.
+    Download (or export) a single Drive file and return a one-line result message.
+    Non-completion messages (e.g. token refresh warnings) are pushed into `notices`.
     """
-    # Recreate refreshable credentials
-    creds = _recreate_creds_from_payload(credentials_payload)
-
-    # async worker
-    async def _process_chunk():
-        # Create an aiohttp session; ensure token is valid before starting
-        # Refresh token if expired
-        if not creds.valid and creds.refresh_token:
+    file_id = task_meta['id']
+    name = task_meta['name']
+    mime = task_meta.get('mimeType', '')
+    # Build URL
+    if mime.startswith('application/vnd.google-apps'):
+        export_mime = _map_export_mime(mime)
+        if not export_mime:
+            return f"Skipped (no export type): {name}"
+        url = f'https://www.googleapis.com/drive/v3/files/{file_id}/export?mimeType={export_mime}'
+        # ensure extension for saved file
+        ext = EXPORT_EXT.get(export_mime, '')
+    else:
+        # direct media download
+        url = f'https://www.googleapis.com/drive/v3/files/{file_id}?alt=media'
+        # try preserve extension from name (if exists)
+        ext = ''
+    # prepare final path
+    # sanitize name for filesystem
+    safe_name = name.translate(_SANITIZE_TABLE)
+    dest = os.path.join(output_folder, safe_name + ext)
+    if _is_up_to_date(dest, task_meta):
+        return f"Skipped (up-to-date): {dest}"
+
+    # refresh token if about to expire: check validity
+    if not creds.valid and creds.refresh_token:
+        try:
             creds.refresh(Request())
+        except Exception as e:
+            notices.put_nowait(f"WARNING: Token refresh failed: {e}")
+            # proceed with existing token if possible
 
-        headers = {'Authorization': f'Bearer {creds.token}'}
-
-        connector = aiohttp.TCPConnector(limit=tasks_per_process)  # limit simultaneous connections
-        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60*10)  # generous read timeout
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            sem = asyncio.Semaphore(tasks_per_process)
-
-            async def _download_task(task_meta):
-                file_id = task_meta['id']
-                name = task_meta['name']
-                mime = task_meta.get('mimeType', '')
-                # Build URL
-                if mime.startswith('application/vnd.google-apps'):
-                    export_mime = _map_export_mime(mime)
-                    if not export_mime:
-                        msg = f"Skipped (no export type): {name}"
-                        queue.put(msg)
-                        return msg
-                    url = f'https://www.googleapis.com/drive/v3/files/{file_id}/export?mimeType={export_mime}'
-                    # ensure extension for saved file
-                    ext = {
-                        'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '.docx',
-                        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': '.xlsx',
-                        'application/vnd.openxmlformats-officedocument.presentationml.presentation': '.pptx',
-                        'application/pdf': '.pdf'
-                    }.get(export_mime, '')
-                else:
-                    # direct media download
-                    url = f'https://www.googleapis.com/drive/v3/files/{file_id}?alt=media'
-                    # try preserve extension from name (if exists)
-                    ext = ''
-                # prepare final path
-                # sanitize name for filesystem
-                safe_name = "".join(c for c in name if c not in "\/:*?\"<>|")
-                dest = os.path.join(output_folder, safe_name + ext)
-
-                # refresh token if about to expire: check validity
-                nonlocal creds
-                if not creds.valid and creds.refresh_token:
-                    try:
-                        creds.refresh(Request())
-                    except Exception as e:
-                        queue.put(f"WARNING: Refresh failed for process {process_id}: {e}")
-                        # proceed with existing token if possible
-
-                # update header with possibly refreshed token
-                local_headers = {'Authorization': f'Bearer {creds.token}'}
+    # update header with possibly refreshed token
+    local_headers = {'Authorization': f'Bearer {creds.token}'}
 
-                try:
-                    # use semaphore to limit concurrency
-                    async with sem:
-                        await _download_file_aio(session, url, local_headers, dest)
-                    msg = f"Downloaded: {dest}"
-                    queue.put(msg)
-                    return msg
-                except Exception as e:
-                    msg = f"Error downloading {name}: {e}"
-                    queue.put(msg)
-                    return msg
-
-            # schedule download tasks
-            tasks = [asyncio.create_task(_download_task(meta)) for meta in file_tasks]
-            # wait for completion
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            return results
-
-    # Run the async worker loop
     try:
-        asyncio.run(_process_chunk())
+        # throttle limits concurrency and paces requests
+        async with throttle:
+            modified = _parse_drive_time(task_meta.get('modifiedTime'))
+            await _download_file_aio(session, url, local_headers, dest, throttle,
+                                     modified.timestamp() if modified else None, created_dirs)
+        return f"Downloaded: {dest}"
     except Exception as e:
-        queue.put(f"WARNING: Process {process_id} failed with error: {e}")
+        return f"Error downloading {name}: {e}"
 
 # ---------------- Public API ----------------
 
+async def mirror_drive_hybrid_async(credentials_json_path: str,
+                                    output_folder: str,
+                                    max_processes: Optional[int] = None,
+                                    tasks_per_process: int = 24,
+                                    progress_callback: Optional[Callable[[int, int, str], None]] = None
+                                    ) -> AsyncGenerator[str, None]:
+    """
+    High-level async generator that:
+      - authenticates once
+      - streams the Drive file listing into a bounded work queue
+      - downloads every file on a single event loop sharing one aiohttp session
+      - yields messages as download results become available
+
+    Downloads start while listing is still running, so the `total` passed to
+    `progress_callback` grows until the listing has finished.
+    Concurrency is `max_processes * tasks_per_process` (the parameters are kept from the
+    former multi-process design so existing callers get the same parallelism).
+    """
+    # 1) Authenticate & get serializable credential payload
+    _, creds_payload = authenticate_and_export_credentials(credentials_json_path)
+    creds = _recreate_creds_from_payload(creds_payload)
+    if not creds.valid and creds.refresh_token:
+        creds.refresh(Request())
+
+    # 2) Decide overall concurrency
+    cpu_count = multiprocessing.cpu_count()
+    max_processes = max_processes or cpu_count
+    max_processes = min(max_processes, cpu_count)
+    concurrency = max(1, max_processes * tasks_per_process)
+
+    # 3) Shared session for listing and every download; closed once the run is over
+    notices: asyncio.Queue = asyncio.Queue()
+    session = await get_session()
+    async with session:
+        # 4) Stream listed files into a bounded queue drained by download workers, so
+        #    downloads start while listing is still running and memory stays O(queue)
+        # the connector never opens more than CONNECTION_LIMIT_PER_HOST connections to Drive,
+        # so a larger limit would only make halving on 429 take several steps to bite
+        throttle = _Throttle(min(concurrency, CONNECTION_LIMIT_PER_HOST))
+        work: asyncio.Queue = asyncio.Queue(maxsize=TASK_QUEUE_SIZE)
+        results: asyncio.Queue = asyncio.Queue()
+        created_dirs: Set[str] = set()  # directories made during this run
+        total = 0
+
+        async def _produce():
+            nonlocal total
+            async for f in list_all_drive_files_async(session, creds, throttle=throttle):
+                # Filter out folders and optionally filter other things
+                if f.get('mimeType') == 'application/vnd.google-apps.folder':
+                    continue
+                total += 1
+                await work.put({ 'id': f['id'], 'name': f['name'], 'mimeType': f.get('mimeType',''), 'size': f.get('size'),
+                                  'modifiedTime': f.get('modifiedTime') })
+
+        async def _work():
+            while True:
+                meta = await work.get()
+                try:
+                    await results.put(await _download_task(session, throttle, creds, meta, output_folder, notices,
+                                                               created_dirs))
+                finally:
+                    work.task_done()
+
+        async def _supervise():
+            try:
+                await _produce()
+                await work.join()
+            finally:
+                await results.put(None)
+
+        workers = [asyncio.create_task(_work()) for _ in range(concurrency)]
+        supervisor = asyncio.create_task(_supervise())
+        try:
+            # 5) Yield results in completion order; `total` grows while listing is in progress
+            completed = 0
+            while True:
+                msg = await results.get()
+                while not notices.empty():
+                    yield notices.get_nowait()
+                if msg is None:
+                    break
+                completed += 1
+                if progress_callback:
+                    # pass the 'current file' as the last part of the message for GUI use
+                    current_file = msg.split(": ", 1)[-1] if ": " in msg else msg
+                    progress_callback(completed, total, current_file)
+                yield msg
+            await supervisor  # re-raise a listing failure
+        finally:
+            supervisor.cancel()
+            for worker in workers:
+                worker.cancel()
+
+        if total == 0:
+            yield "No files found."
+            return
+
+    while not notices.empty():
+        yield notices.get_nowait()
+
+    yield "All downloads finished."
+
 def mirror_drive_hybrid(credentials_json_path: str,
                         output_folder: str,
                         max_processes: Optional[int] = None,
@@ -241,82 +732,34 @@ def mirror_drive_hybrid(credentials_json_path: str,
                         progress_callback: Optional[Callable[[int, int, str], None]] = None
                         ) -> Generator[str, None, None]:
     """
-    High-level generator that:
-      - authenticates once
-      - lists Drive files
-      - starts multiple processes, each running async downloads
-      - yields messages as download results become available
+    Synchronous wrapper around mirror_drive_hybrid_async(). The event loop runs on a
+    background thread and messages are handed over through a queue.Queue as they arrive.
+    `progress_callback` is invoked from that background thread.
 
     Usage:
         for msg in mirror_drive_hybrid('credentials.json', './out'):
             print(msg)
     """
-    # 1) Authenticate & get Drive service + serializable credential payload
-    service, creds_payload = authenticate_and_export_credentials(credentials_json_path)
+    messages: queue.Queue = queue.Queue()
+    done = object()
 
-    # 2) List files
-    all_files = list_all_drive_files(service)
-    # Filter out folders and optionally filter other things
-    targets = [ { 'id': f['id'], 'name': f['name'], 'mimeType': f.get('mimeType',''), 'size': f.get('size') } 
-               for f in all_files if f.get('mimeType') != 'application/vnd.google-apps.folder' ]
+    async def _pump():
+        async for msg in mirror_drive_hybrid_async(credentials_json_path, output_folder,
+                                                   max_processes, tasks_per_process, progress_callback):
+            messages.put(msg)
 
-    total = len(targets)
-    if total == 0:
-        yield "No files found."
-        return
-
-    # 3) Decide number of processes
-    cpu_count = multiprocessing.cpu_count()
-    max_processes = max_processes or cpu_count
-    max_processes = min(max_processes, cpu_count)
-
-    # 4) Split tasks into chunks for each process
-    chunks = _chunkify(targets, max_processes)
-
-    manager = Manager()
-    queue = manager.Queue()
-
-    # 5) Launch worker processes via multiprocessing.Pool; each process will put messages into queue
-    pool = Pool(processes=max_processes)
-    for i, chunk in enumerate(chunks):
-        if not chunk:
-            continue
-        pool.apply_async(_worker_process_main, args=(creds_payload, chunk, output_folder, queue, tasks_per_process, i))
-
-    # 6) Collect results as they appear in the queue
-    completed = 0
-    while completed < total:
+    def _run_loop():
         try:
-            msg = queue.get(timeout=1.0)  # wait for a message
-            # If message is a download/completion message format we increment completed.
-            # We treat lines starting with 'Downloaded:' or 'Skipped' or 'Error' as one file completion.
-            if msg.startswith("Downloaded:") or msg.startswith("Skipped") or msg.startswith("Error") or msg.startswith("WARNING:"):
-                completed += 1
-            # send progress callback
-            if progress_callback:
-                # pass the 'current file' as the last part of the message for GUI use
-                current_file = msg.split(": ", 1)[-1] if ": " in msg else msg
-                progress_callback(completed, total, current_file)
-            yield msg
-        except Exception:
-            # timeout — continue to check if processes are still running
-            # When nothing is in the queue we loop — but still check if all worker processes finished
-            if not any(p.is_alive() for p in pool._pool):
-                # If no alive workers and queue is empty, break
-                break
+            asyncio.run(_pump())
+        except Exception as e:
+            messages.put(f"WARNING: Mirror failed with error: {e}")
+        finally:
+            messages.put(done)
 
-    # 7) cleanup
-    try:
-        pool.close()
-        pool.join()
-    except Exception:
-        pass
+    threading.Thread(target=_run_loop, daemon=True).start()
 
-    # Drain any remaining messages
-    while not queue.empty():
-        try:
-            yield queue.get_nowait()
-        except Exception:
+    while True:
+        msg = messages.get()
+        if msg is done:
             break
-
-    yield "All worker processes finished."
+        yield msg
@@ -1,32 +1,119 @@
 from __future__ import print_function
 import os
 import io
+import json
+import hashlib
+import math
 import pickle
+import time
+import queue
+import random
+import threading
+import shutil
+import warnings
 import asyncio
 import concurrent.futures
-from functools import partial
-from multiprocessing import cpu_count
+from collections import deque
+from datetime import datetime
+from functools import partial, lru_cache
+import httplib2
+import requests
+import urllib3
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.http import HttpRequest
 from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
+from google.auth.transport.requests import Request, AuthorizedSession
+from google.oauth2.credentials import Credentials
+from requests.adapters import HTTPAdapter
+
+# Use uvloop's libuv-based event loop when it is installed (not available on Windows)
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
+def _env_int(name, default):
+    """
+    Integer setting from environment variable `name`, or `default` when it is unset.
+    An invalid value falls back to `default` with a warning instead of failing the import.
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        warnings.warn(f"Ignoring invalid {name}={value!r}; using {default}")
+        return default
+
 
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
-MAX_PATH_LEN = 240 
+MAX_PATH_LEN = 240  # max bytes (UTF-8) of a sanitized file/folder name
+# bytes moved per read/write while streaming a download; override with DRIVE_CHUNK_SIZE
+COPY_BUFFER_SIZE = max(1, _env_int('DRIVE_CHUNK_SIZE', 1024 * 1024))
+DOWNLOAD_TIMEOUT = (30, 600)  # (connect, read) seconds for media requests
+HTTP_TIMEOUT = 60  # seconds, metadata requests
+PROGRESS_INTERVAL = 0.1  # seconds between progress_callback calls (~10 Hz)
+DROP_CACHE_MIN_SIZE = 8 * 1024 * 1024  # bytes; smaller downloads are left in the page cache
+_SANITIZE_TABLE = str.maketrans({ch: '_' for ch in '<>:"/\\|?*\0'})  # filesystem-illegal chars -> '_'
+RESUME_ATTEMPTS = max(1, _env_int('DRIVE_MIRROR_RESUME_ATTEMPTS', 5))  # tries per file, resuming from .part
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BATCH_SIZE = 100  # requests per Drive batch call (the server-side limit)
+BATCH_ATTEMPTS = 5  # tries for batched lookups that were rate limited
+RATE_LIMIT_REASONS = {'userRateLimitExceeded', 'rateLimitExceeded'}
+# download threads when max_threads isn't given; override with DRIVE_MIRROR_WORKERS
+DEFAULT_WORKERS = max(1, _env_int('DRIVE_MIRROR_WORKERS', min(32, (os.cpu_count() or 1) + 4)))
+# concurrent modifiedTime ranges per listing query; folders and files are listed at the same
+# time, so at most 2 * LIST_WORKERS files.list calls are in flight
+LIST_WORKERS = 8
+LIST_RETRIES = 5  # files.list retries on 429/403 rate limit/5xx, with the client's exponential backoff
+LIST_FIELDS = ("nextPageToken, files(id, name, mimeType, parents, driveId, owners, size, shared, md5Checksum, "
+               "modifiedTime)")
 
 
 # ------------------ Authentication ------------------ #
-def authenticate(credentials_path, token_path=None):
+def _thread_safe_request_builder(creds):
     """
-    Authenticate and return Drive API service. Creates/uses token.pickle next to credentials by default.
+    httplib2.Http is not thread-safe, so a service shared between download threads
+    must not push every request through one connection object. Each thread gets its own
+    AuthorizedHttp, which it keeps reusing so its TLS connections stay alive across requests.
     """
+    local = threading.local()
+
+    def build_request(http, *args, **kwargs):
+        thread_http = getattr(local, 'http', None)
+        if thread_http is None:
+            thread_http = local.http = AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+        return HttpRequest(thread_http, *args, **kwargs)
+    return build_request
+
+
+def _save_token(creds, token_path):
+    with open(token_path, 'w') as token:
+        token.write(creds.to_json())
+
+
+def load_credentials(credentials_path, token_path=None):
+    """
+    Return valid OAuth credentials. Creates/uses token.json next to credentials by default.
+    A token.pickle left there by older versions is converted to token.json once.
+    """
+    token_dir = os.path.dirname(credentials_path)
     if token_path is None:
-        token_path = os.path.join(os.path.dirname(credentials_path), 'token.pickle')
+        token_path = os.path.join(token_dir, 'token.json')
 
     creds = None
     if os.path.exists(token_path):
-        with open(token_path, 'rb') as token:
-            creds = pickle.load(token)
+        with open(token_path, 'r') as token:
+            creds = Credentials.from_authorized_user_info(json.load(token), SCOPES)
+    else:
+        legacy_path = os.path.join(token_dir, 'token.pickle')
+        if os.path.exists(legacy_path):
+            with open(legacy_path, 'rb') as token:
+                creds = pickle.load(token)
+            _save_token(creds, token_path)
 
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
@@ -34,35 +121,166 @@ def authenticate(credentials_path, token_path=None):
         else:
             flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
             creds = flow.run_local_server(port=0)
-        with open(token_path, 'wb') as token:
-            pickle.dump(creds, token)
+        _save_token(creds, token_path)
+    return creds
+
 
-    service = build('drive', 'v3', credentials=creds)
+def build_service(creds):
+    """
+    Build a Drive API service from credentials. The service is safe to share between threads.
+    """
+    # cache_discovery=False: the Drive v3 discovery document ships with the client library,
+    # so skip the file-cache lookup (and its oauth2client warning)
+    service = build('drive', 'v3',
+                    http=AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT)),
+                    cache_discovery=False,
+                    requestBuilder=_thread_safe_request_builder(creds))
     return service
 
 
+def authenticate(credentials_path, token_path=None):
+    """
+    Authenticate and return Drive API service. Creates/uses token.json next to credentials by default.
+    The service is safe to share between threads.
+    """
+    return build_service(load_credentials(credentials_path, token_path))
+
+
 # ------------------ Drive File Utilities ------------------ #
-def get_all_files(service):
+def _list_page(service, query, page_token=None, **extra):
+    """One files.list call over everything visible to the user."""
+    params = dict(
+        q=query,
+        corpora="user",
+        includeItemsFromAllDrives=True,
+        supportsAllDrives=True,
+        fields=LIST_FIELDS,
+        pageToken=page_token,
+        pageSize=1000
+    )
+    params.update(extra)
+    return service.files().list(**params).execute(num_retries=LIST_RETRIES)
+
+
+def _list_files(service, query, response=None, **extra):
     """
-    Fetch all files and folders visible to the user, including 'Shared with me' and shared drives.
-    Returns a list of file dicts.
+    Page through every result of `query`, optionally continuing from an already-fetched first response.
+    `extra` files.list parameters (e.g. orderBy) must match the ones that response was fetched with.
     """
     files = []
-    page_token = None
     while True:
-        response = service.files().list(
-            q="trashed = false",
-            corpora="user",
-            includeItemsFromAllDrives=True,
-            supportsAllDrives=True,
-            fields="nextPageToken, files(id, name, mimeType, parents, driveId, owners, size, shared)",
-            pageToken=page_token,
-            pageSize=1000
-        ).execute()
+        if response is None:
+            response = _list_page(service, query, **extra)
         files.extend(response.get('files', []))
         page_token = response.get('nextPageToken')
         if not page_token:
             break
+        response = _list_page(service, query, page_token, **extra)
+    return files
+
+
+def _parse_drive_time(value):
+    """Parse a Drive RFC 3339 timestamp such as '2024-01-31T12:00:00.000Z'."""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _modified_time_partitions(query, start, end, partitions):
+    """
+    Split the part of `query` modified at or after `start` into disjoint modifiedTime ranges
+    up to `end`. The last range is open-ended so files modified while listing are still covered.
+    """
+    fmt = '%Y-%m-%dT%H:%M:%S'
+    step = (end - start) / partitions
+    lower = start.strftime(fmt)
+    cuts = sorted({(start + step * i).strftime(fmt) for i in range(1, partitions)} - {lower})
+    bounds = [lower] + cuts
+    queries = [f"{query} and modifiedTime >= '{lo}' and modifiedTime < '{hi}'" for lo, hi in zip(bounds, bounds[1:])]
+    queries.append(f"{query} and modifiedTime >= '{bounds[-1]}'")
+    return queries
+
+
+def _list_query(service, query, parallel_list=True):
+    """
+    Return every file matching `query`. Pagination is sequential per query, so with
+    `parallel_list` a listing that spans more than one page is continued in parallel.
+    The first page is fetched oldest first and kept; the time it covers gives an estimate of
+    the pages still to come, and the remaining modifiedTime range is split into that many
+    ranges (at most LIST_WORKERS) fetched on a thread pool.
+    """
+    first = _list_page(service, query, orderBy='modifiedTime')
+    # (Drive may return an empty page that still has a nextPageToken; just keep paging then)
+    if not parallel_list or not first.get('nextPageToken') or not first.get('files'):
+        return _list_files(service, query, first, orderBy='modifiedTime')
+
+    page = first.get('files', [])
+    oldest = _parse_drive_time(page[0]['modifiedTime'])
+    last = _parse_drive_time(page[-1]['modifiedTime'])
+    found = _list_page(service, query, orderBy='modifiedTime desc', fields="files(modifiedTime)",
+                       pageSize=1).get('files', [])
+    newest = _parse_drive_time(found[0]['modifiedTime']) if found else last
+    span = (last - oldest).total_seconds()
+    expected = math.ceil((newest - last).total_seconds() / span) if span > 0 else LIST_WORKERS
+    partitions = max(1, min(LIST_WORKERS, expected))
+    if partitions == 1:
+        return _list_files(service, query, first, orderBy='modifiedTime')
+
+    # everything older than the first page's last item is already listed
+    queries = _modified_time_partitions(query, last, newest, partitions)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        parts = executor.map(partial(_list_files, service), queries)
+        # items sharing the boundary time, or modified mid-listing, can show up twice; keep one copy
+        unique = {f['id']: f for f in page}
+        unique.update((f['id'], f) for part in parts for f in part)
+    return list(unique.values())
+
+
+def get_all_files(service, parallel_list=True):
+    """
+    Fetch all files and folders visible to the user, including 'Shared with me' and shared drives.
+    Returns a list of file dicts.
+    Folders and files are listed by two server-side filtered queries running concurrently.
+    """
+    queries = [
+        "trashed = false and mimeType = 'application/vnd.google-apps.folder'",
+        "trashed = false and mimeType != 'application/vnd.google-apps.folder'",
+    ]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        folders, others = executor.map(partial(_list_query, service, parallel_list=parallel_list), queries)
+    return folders + others
+
+
+def walk_folder(service, folder_id):
+    """
+    Fetch one folder and everything below it with targeted "'<id>' in parents" queries
+    (breadth-first), instead of listing the whole Drive. Returns a list of file dicts
+    including the folder itself, whose parent is dropped so paths start at it.
+    """
+    root = service.files().get(
+        fileId=folder_id,
+        supportsAllDrives=True,
+        fields="id, name, mimeType, driveId, owners, size, shared, md5Checksum"
+    ).execute()
+    files = [root]
+    pending = deque([folder_id])
+    while pending:
+        parent_id = pending.popleft()
+        page_token = None
+        while True:
+            response = service.files().list(
+                q=f"'{parent_id}' in parents and trashed = false",
+                includeItemsFromAllDrives=True,
+                supportsAllDrives=True,
+                fields=LIST_FIELDS,
+                pageToken=page_token,
+                pageSize=1000
+            ).execute()
+            for f in response.get('files', []):
+                files.append(f)
+                if f.get('mimeType') == 'application/vnd.google-apps.folder':
+                    pending.append(f['id'])
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
     return files
 
 
@@ -81,71 +299,308 @@ def build_folder_map(files):
     return folder_map
 
 
+def _is_retryable_batch_error(exception):
+    """
+    True for per-request batch errors worth retrying: 429, 5xx and 403 rate-limit errors.
+    Other errors (404, 403 permission denied) mean the item is inaccessible.
+    """
+    status = int(getattr(getattr(exception, 'resp', None), 'status', 0) or 0)
+    if status == 429 or status >= 500:
+        return True
+    if status != 403:
+        return False
+    try:
+        errors = json.loads(exception.content).get('error', {}).get('errors', [])
+    except (AttributeError, TypeError, ValueError):
+        return False
+    return any(e.get('reason') in RATE_LIMIT_REASONS for e in errors if isinstance(e, dict))
+
+
+def fill_missing_parents(service, files, folder_map):
+    """
+    Look up parent folders that are referenced but were not listed (e.g. ancestors of items
+    shared with the user) and add them to folder_map, so their paths can be reconstructed.
+    Lookups are grouped into batch requests of BATCH_SIZE files.get calls each; lookups that
+    were rate limited are retried with backoff up to BATCH_ATTEMPTS times.
+    Top-level folders (no parents, e.g. the My Drive root) are not added, keeping paths as before.
+    """
+    checked = set()
+    while True:
+        referenced = {f['parents'][0] for f in files if f.get('parents')}
+        referenced.update(info['parent'] for info in folder_map.values() if info['parent'])
+        missing = [fid for fid in referenced if fid not in folder_map and fid not in checked]
+        if not missing:
+            break
+        checked.update(missing)
+
+        found = {}
+        retry = []
+
+        def collect(request_id, response, exception):
+            if exception is None:
+                if response.get('parents'):
+                    found[response['id']] = {
+                        'name': response.get('name', 'Unnamed Folder'),
+                        'parent': response['parents'][0]
+                    }
+            elif _is_retryable_batch_error(exception):
+                retry.append(request_id)
+            # other per-request errors mean the folder is inaccessible; it simply stays unknown
+
+        lookup = missing
+        for attempt in range(1, BATCH_ATTEMPTS + 1):
+            retry.clear()
+            for start in range(0, len(lookup), BATCH_SIZE):
+                batch = service.new_batch_http_request(callback=collect)
+                for fid in lookup[start:start + BATCH_SIZE]:
+                    batch.add(service.files().get(fileId=fid, fields="id, name, parents", supportsAllDrives=True),
+                              request_id=fid)
+                batch.execute()
+            if not retry or attempt == BATCH_ATTEMPTS:
+                break
+            lookup = list(retry)
+            time.sleep(min(60, 2 ** attempt + random.uniform(0, 1)))
+        folder_map.update(found)
+    return folder_map
+
+
+@lru_cache(maxsize=16384)
 def sanitize_name(name):
     """
     Replace filesystem-illegal chars and trim length. Cross-platform safe.
+    Cached because folder names repeat across many items.
     """
     if not name:
         return "untitled"
-    invalid_chars = '<>:"/\\|?*\0'
-    clean = ''.join(ch if ch not in invalid_chars else '_' for ch in name)
-    clean = clean.strip()
+    clean = name.translate(_SANITIZE_TABLE).strip()
     
-    if len(clean) > MAX_PATH_LEN:
+    # filesystems limit a name's *bytes* (ext4/NTFS: 255), and CJK text is 3 bytes/char in UTF-8
+    if len(clean.encode('utf-8')) > MAX_PATH_LEN:
         # try to preserve extension
         base, ext = os.path.splitext(clean)
         ext = ext[:20]  # keep extension short
-        clean = base[:MAX_PATH_LEN - len(ext)] + ext
+        budget = MAX_PATH_LEN - len(ext.encode('utf-8'))
+        # cut on a byte boundary and drop a trailing partial character
+        clean = base.encode('utf-8')[:budget].decode('utf-8', 'ignore') + ext
     return clean or "untitled"
 
 
-def resolve_path_for_item(item, folder_map, root_folder):
+def build_folder_paths(folder_map, root_folder):
+    """
+    Map every folder_id in folder_map to its absolute local directory, computed once.
+    Each folder's path builds on its parent's already-computed path, so the whole table
+    costs one pass over the folders instead of one parent-chain walk per item.
     """
-    Build the local directory path for an item by following parents up to root.
+    folder_paths = {}
+    for folder_id in folder_map:
+        chain = deque()
+        seen = set()
+        current = folder_id
+        while current in folder_map and current not in folder_paths and current not in seen:
+            seen.add(current)
+            chain.appendleft(current)
+            current = folder_map[current].get('parent')
+        base = folder_paths.get(current, root_folder)
+        for fid in chain:
+            base = os.path.join(base, sanitize_name(folder_map[fid]['name']))
+            folder_paths[fid] = base
+    return folder_paths
+
+
+def resolve_path_for_item(item, folder_paths, root_folder):
+    """
+    Return the local directory path for an item from the precomputed folder_paths table.
     If parents are missing (e.g., file in "Shared with me" without parent metadata), put it in root_folder/Shared/
+    Directories are not created here; mirror_drive_async creates each unique one up front.
     """
-    parts = []
     parent = item.get('parents', [None])[0] if item.get('parents') else None
 
-    
-    while parent and parent in folder_map:
-        folder = folder_map[parent]
-        parts.insert(0, sanitize_name(folder['name']))
-        parent = folder.get('parent')
-
-    
-    if not parts:
-        
-        if item.get('shared'):
-            parts = ['Shared']
-        else:
-            parts = ['My Drive']
-
-    local_dir = os.path.join(root_folder, *parts)
-    os.makedirs(local_dir, exist_ok=True)
+    local_dir = folder_paths.get(parent)
+    if local_dir is None:
+        local_dir = os.path.join(root_folder, 'Shared' if item.get('shared') else 'My Drive')
     return local_dir
 
 
-def get_local_path(item, folder_map, root_folder):
+def get_local_path(item, folder_paths, root_folder):
     """
     Return the final local path (without extension for google-apps types) to save the file.
-    Uses resolve_path_for_item() to ensure folders exist.
     """
-    local_dir = resolve_path_for_item(item, folder_map, root_folder)
+    local_dir = resolve_path_for_item(item, folder_paths, root_folder)
     file_name = sanitize_name(item.get('name', 'untitled'))
     return os.path.join(local_dir, file_name)
 
 
 # ------------------ Download Logic ------------------ #
-def download_file(credentials_path, item, folder_map, root_folder):
+def get_media_path(item, folder_paths, root_folder):
+    """
+    Return the final local path of a regular (non google-apps) file, as written by download_file().
+    """
+    _, ext = os.path.splitext(item.get('name', ''))
+    return get_local_path(item, folder_paths, root_folder) + ext
+
+
+def content_key(item):
+    """
+    Identity of a file's content: (md5Checksum, size). None for items Drive reports no checksum
+    for (google-apps documents, which are exported rather than downloaded).
     """
-    Download or export a single file.
-    Each worker calls authenticate() which will reuse token.pickle if present (no repeated OAuth prompt).
+    md5 = item.get('md5Checksum')
+    return (md5, item.get('size')) if md5 else None
+
+
+def link_duplicate(source_path, item, folder_paths, root_folder):
+    """
+    Materialize `item` from an already-downloaded file with identical content: hardlink when
+    the filesystem allows it, otherwise copy.
+    """
+    final_path = get_media_path(item, folder_paths, root_folder)
+    if os.path.exists(final_path):
+        return f"Skipped (exists): {final_path}"
+    try:
+        os.link(source_path, final_path)
+    except OSError:
+        # no hardlink support (e.g. FAT/exFAT, some Windows and network shares) or a different device
+        try:
+            shutil.copy2(source_path, final_path)
+        except Exception as e:
+            return f"Error downloading {item.get('name', 'unknown')}: {e}"
+    return f"Linked (duplicate of {source_path}): {final_path}"
+
+
+def _fadvise(fd, advice):
+    """
+    Give the kernel a posix_fadvise() hint (e.g. 'POSIX_FADV_SEQUENTIAL') for the whole file.
+    No-op where unsupported (Windows, macOS).
+    """
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+        except OSError:
+            pass
+
+
+def _drop_cache(fd):
+    """
+    Write the file's dirty pages back, then advise POSIX_FADV_DONTNEED. The kernel ignores
+    DONTNEED for pages that are still dirty, so without the fdatasync() it would do almost nothing
+    for freshly written data. Only files of at least DROP_CACHE_MIN_SIZE bytes are worth that
+    blocking write-back; for small files the download thread moves on right away.
+    No-op where posix_fadvise is unsupported.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        if os.fstat(fd).st_size < DROP_CACHE_MIN_SIZE:
+            return
+        os.fdatasync(fd)
+    except OSError:
+        return
+    _fadvise(fd, 'POSIX_FADV_DONTNEED')
+
+
+def _stream_to_part(session, uri, part_path):
+    """
+    One download attempt into part_path. If part_path already holds bytes from an earlier
+    attempt or run, only the remainder is requested with a Range header and appended.
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    # identity encoding when resuming: byte ranges of a compressed body cannot be decoded on their own
+    headers = {'Range': f'bytes={offset}-', 'Accept-Encoding': 'identity'} if offset else {}
+    with session.get(uri, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as resp:
+        if offset and resp.status_code == 416:
+            # "Content-Range: bytes */N": the partial file already holds all N bytes (e.g. a crash
+            # just before os.replace), so there is nothing left to fetch
+            total = resp.headers.get('Content-Range', '').rpartition('/')[2]
+            if total.isdigit() and int(total) == offset:
+                return
+            # stale partial file (e.g. the remote file changed): start over
+            os.remove(part_path)
+            return _stream_to_part(session, uri, part_path)
+        resp.raise_for_status()
+        resp.raw.decode_content = True  # undo any Content-Encoding while copying
+        # 206 -> append the missing bytes; 200 -> server ignored Range, rewrite from scratch
+        mode = 'ab' if offset and resp.status_code == 206 else 'wb'
+        # short reads from the socket are coalesced into COPY_BUFFER_SIZE disk writes
+        with io.BufferedWriter(io.FileIO(part_path, mode), buffer_size=COPY_BUFFER_SIZE) as fh:
+            _fadvise(fh.fileno(), 'POSIX_FADV_SEQUENTIAL')
+            shutil.copyfileobj(resp.raw, fh, length=COPY_BUFFER_SIZE)
+            fh.flush()
+            # one-shot data: let the kernel drop it from the page cache instead of evicting hotter pages
+            _drop_cache(fh.fileno())
+
+
+def _claim_part(part_path, revision):
+    """
+    Make part_path safe to resume for `revision` of the remote file. A .part left by another
+    revision (or whose revision is unknown) would be spliced with the new file's bytes, so it
+    is discarded; the revision it is now being written for is recorded in a '.rev' sidecar.
+    """
+    rev_path = part_path + '.rev'
+    try:
+        with open(rev_path, 'r') as fh:
+            saved = fh.read()
+    except OSError:
+        saved = None
+    if revision is not None and saved == revision:
+        return
+    for path in (part_path, rev_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    if revision is not None:
+        with open(rev_path, 'w') as fh:
+            fh.write(revision)
+
+
+def _file_md5(path):
+    """Hex MD5 digest of the file at path, read in COPY_BUFFER_SIZE pieces."""
+    digest = hashlib.md5()
+    with open(path, 'rb') as fh:
+        for block in iter(partial(fh.read, COPY_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _download_resumable(session, uri, final_path, revision=None, md5=None):
+    """
+    Download uri to final_path through final_path + '.part', retrying transient failures
+    (connection drops, timeouts, 429/5xx) with exponential backoff up to RESUME_ATTEMPTS times.
+    Each retry resumes where the previous attempt stopped; the .part file is kept on failure.
+    A .part left by an earlier run is only resumed when it was written for the same `revision`
+    (the item's modifiedTime). With `md5`, the finished .part must match it before it is renamed.
+    """
+    part_path = final_path + '.part'
+    _claim_part(part_path, revision)
+    for attempt in range(1, RESUME_ATTEMPTS + 1):
+        try:
+            _stream_to_part(session, uri, part_path)
+            break
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code not in RETRY_STATUSES or attempt == RESUME_ATTEMPTS:
+                raise
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                urllib3.exceptions.HTTPError):
+            if attempt == RESUME_ATTEMPTS:
+                raise
+        time.sleep(min(60, 2 ** attempt + random.uniform(0, 1)))
+    if md5 and _file_md5(part_path) != md5:
+        _claim_part(part_path, None)
+        raise ValueError(f"MD5 checksum mismatch, discarded partial download of {final_path}")
+    os.replace(part_path, final_path)
+    _claim_part(part_path, None)  # drop the now orphaned sidecar
+
+
+def download_file(service, session, item, folder_paths, root_folder):
+    """
+    Download or export a single file using an already-authenticated (thread-safe) Drive service.
+    The media URL built by the API client is fetched with a streaming GET on the shared
+    AuthorizedSession and copied to disk in COPY_BUFFER_SIZE pieces, so memory use does not
+    grow with file size. Interrupted downloads resume from their .part file.
     """
-    service = authenticate(credentials_path)
     mime_type = item.get('mimeType', '')
     file_id = item.get('id')
-    base_local = get_local_path(item, folder_map, root_folder)
+    base_local = get_local_path(item, folder_paths, root_folder)
 
     try:
         if mime_type.startswith('application/vnd.google-apps'):
@@ -180,26 +635,32 @@ def download_file(credentials_path, item, folder_map, root_folder):
             return f"Skipped (exists): {final_path}"
 
         # Stream download to file
-        fh = io.FileIO(final_path, 'wb')
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
+        _download_resumable(session, request.uri, final_path, item.get('modifiedTime'), item.get('md5Checksum'))
         return f"Downloaded: {final_path}"
     except Exception as e:
         return f"Error downloading {item.get('name', 'unknown')}: {e}"
 
 
-# ------------------ Async + Multiprocessing Orchestration ------------------ #
-async def mirror_drive_async(credentials_path, output_folder, max_threads=8, progress_callback=None):
+# ------------------ Async + Thread Pool Orchestration ------------------ #
+async def mirror_drive_async(credentials_path, output_folder, max_threads=None, progress_callback=None,
+                             root_folder_id=None):
     """
-    High-level async generator that downloads files using a process pool with concurrent workers.
+    High-level async generator that downloads files using a thread pool with concurrent workers.
+    Downloads are network-bound, so threads (which release the GIL while waiting on sockets)
+    share one authenticated service instead of re-authenticating in separate processes.
     Yields per-file messages so GUI can display them live.
+    `max_threads` defaults to DEFAULT_WORKERS: min(32, cpu_count + 4), or the
+    DRIVE_MIRROR_WORKERS environment variable when set.
+    Pass `root_folder_id` to mirror only that folder's subtree (listed with walk_folder())
+    instead of everything visible to the user.
     """
-    # 1) initial authentication + metadata fetch (creates token.pickle)
-    service = authenticate(credentials_path)
-    files = get_all_files(service)
+    # 1) initial authentication + metadata fetch (creates token.json)
+    creds = load_credentials(credentials_path)
+    service = build_service(creds)
+    files = walk_folder(service, root_folder_id) if root_folder_id else get_all_files(service)
     folder_map = build_folder_map(files)
+    fill_missing_parents(service, files, folder_map)
+    folder_paths = build_folder_paths(folder_map, output_folder)
 
     # Consider all non-folder items as targets
     targets = [f for f in files if f.get('mimeType') != 'application/vnd.google-apps.folder']
@@ -210,55 +671,103 @@ async def mirror_drive_async(credentials_path, output_folder, max_threads=8, pro
         return
 
     completed = 0
- 
-    processes = min(cpu_count(), max(1, int(os.getenv('DRIVE_MIRROR_PROCS', cpu_count()))))
+    last_progress = 0.0
+    max_threads = max_threads or DEFAULT_WORKERS
+    # one keep-alive pool shared by every download thread, large enough that no thread
+    # has to open (and TLS-handshake) a throwaway connection
+    session = AuthorizedSession(creds)
+    adapter = HTTPAdapter(pool_connections=max_threads, pool_maxsize=max_threads)
+    session.mount('https://', adapter)
 
     
     loop = asyncio.get_running_loop()
-    executor = concurrent.futures.ProcessPoolExecutor(max_workers=processes)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_threads)
 
     
-    tasks = [loop.run_in_executor(executor, partial(download_file, credentials_path, item, folder_map, output_folder))
-             for item in targets]
+    # create every destination directory once, before the download fan-out
+    for local_dir in {resolve_path_for_item(item, folder_paths, output_folder) for item in targets}:
+        os.makedirs(local_dir, exist_ok=True)
+
+    # Identical content (same md5Checksum + size) is downloaded once; the other copies are
+    # linked to it when that download finishes
+    primaries = []
+    duplicates = {}
+    for item in targets:
+        key = content_key(item)
+        if key is not None and key in duplicates:
+            duplicates[key].append(item)
+        else:
+            if key is not None:
+                duplicates[key] = []
+            primaries.append(item)
+
+    download = partial(download_file, service, session, folder_paths=folder_paths, root_folder=output_folder)
+    pending = {loop.run_in_executor(executor, download, item): item for item in primaries}
 
     
-    for coro in asyncio.as_completed(tasks):
-        result = await coro
-        completed += 1
-        # progress_callback gets (completed, total, last_message)
-        if progress_callback:
-            try:
-                progress_callback(completed, total, result)
-            except Exception:
-                pass
-        yield result
+    while pending:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for fut in done:
+            item = pending.pop(fut)
+            result = fut.result()
+            copies = duplicates.pop(content_key(item), None) if content_key(item) else None
+            if copies:
+                if result.startswith("Downloaded:") or result.startswith("Skipped (exists):"):
+                    source_path = get_media_path(item, folder_paths, output_folder)
+                    for dup in copies:
+                        pending[loop.run_in_executor(executor, link_duplicate, source_path, dup,
+                                                     folder_paths, output_folder)] = dup
+                else:
+                    # the first copy failed: fetch the others independently
+                    for dup in copies:
+                        pending[loop.run_in_executor(executor, download, dup)] = dup
+            completed += 1
+            # progress_callback gets (completed, total, last_message), rate-limited to
+            # PROGRESS_INTERVAL so a chatty GUI callback can't hold up the download loop;
+            # every message is still yielded below
+            now = time.monotonic()
+            if progress_callback and (now - last_progress >= PROGRESS_INTERVAL or completed == total):
+                last_progress = now
+                try:
+                    progress_callback(completed, total, result)
+                except Exception:
+                    pass
+            yield result
 
     
     executor.shutdown(wait=True)
+    session.close()
 
 
-def mirror_drive(credentials_path, output_folder, max_threads=8, progress_callback=None):
+def mirror_drive(credentials_path, output_folder, max_threads=None, progress_callback=None, root_folder_id=None):
     """
-    Synchronous wrapper for GUI compatibility. Returns generator-like behavior by collecting yielded items.
+    Synchronous wrapper for GUI compatibility. The async generator runs on one event loop in a
+    background thread and each message is yielded as soon as it is produced, so downloads keep
+    going while the caller handles the previous message. Errors are re-raised in the caller.
     """
-    async def run_and_collect():
-        async for item in mirror_drive_async(credentials_path, output_folder, max_threads, progress_callback):
-            yield item
+    messages = queue.Queue()
+    done = object()
 
-    # run the async generator and collect items via an event loop
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    async def pump():
+        async for item in mirror_drive_async(credentials_path, output_folder, max_threads, progress_callback,
+                                             root_folder_id):
+            messages.put(item)
 
-    async_gen = run_and_collect()
-    results = []
-    try:
-        while True:
-            item = loop.run_until_complete(async_gen.__anext__())
-            results.append(item)
-    except StopAsyncIteration:
-        pass
-    finally:
-        loop.close()
-    # Return an iterator over results so your GUI loop "for update in mirror_drive(...)" still works
-    for r in results:
-        yield r
+    def run_loop():
+        try:
+            asyncio.run(pump())
+        except BaseException as e:
+            messages.put(e)
+        finally:
+            messages.put(done)
+
+    threading.Thread(target=run_loop, daemon=True).start()
+
+    # "for update in mirror_drive(...)" receives updates live
+    while True:
+        item = messages.get()
+        if item is done:
+            break
+        if isinstance(item, BaseException):
+            raise item
+        yield item